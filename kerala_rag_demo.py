@@ -2,13 +2,65 @@
 kerala_rag_demo.py
 Simple RAG prototype for the Kerala Ayurveda content pack.
 Save and run: python kerala_rag_demo.py
+Cross-check the scoring paths and save/load: python kerala_rag_demo.py --check
 """
 
+import hashlib
+import heapq
 import json
+import math
+import os
+import pickle
+import random
 import re
-from typing import List, Dict, Any, Tuple
+import sys
+import tempfile
+from array import array
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Tuple, Optional, Set, Iterator
 from dataclasses import dataclass
 
+try:  # optional: vectorised scoring for larger corpora
+    import numpy as np
+except ImportError:
+    np = None
+
+# ======================================================================
+# Precompiled patterns
+# ======================================================================
+
+_TOKEN_RE = re.compile(r'\b\w+\b')
+_SLUG_NONALNUM = re.compile(r'[^a-z0-9]+')
+# ASCII fast path for _SLUG_NONALNUM: bytes.translate maps every byte outside [a-z0-9] to '_'
+_SLUG_TABLE = bytes(i if chr(i).isascii() and (chr(i).isdigit() or chr(i).islower()) else ord('_')
+                    for i in range(256))
+_SLUG_UNDERSCORES = re.compile(r'_{2,}')
+# One '## Title' section: title line, then body up to the next heading or EOF
+_MD_SECTION_RE = re.compile(r'\r?\n##\s+(?P<title>[^\n]*)(?P<body>.*?)(?=\r?\n##\s+|\Z)', re.S)
+# Match '## <num>. Question' followed by answer until next '## <num>.' or EOF
+_FAQ_PATTERN = re.compile(r'##\s*\d+\.\s*(.+?)\n\n(.*?)(?=\n##\s*\d+\.|\Z)', re.S)
+_SENT_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+# BM25 parameters
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+
+# Score bonuses layered on top of BM25
+_COVERAGE_WEIGHT = 5.0
+_PHRASE_BONUS = 15.0
+_METADATA_BOOST = 3.0
+
+# Corpus size (in chunks) from which queries may be scored on NumPy arrays
+_VECTORIZE_MIN_DOCS = 1000
+# Array scoring pays a fixed O(N_docs) per query; it only beats the postings loop
+# once the query's postings reach this fraction of the chunk count
+_VECTORIZE_POSTINGS_PER_DOC = 0.02
+
+# Index persistence (SimpleRAGSystem.save / load): chunk columns and the vocabulary
+# are pickled; the index arrays go to separate .npy files so they can be memory-mapped
+_PICKLED_STATE = ('doc_ids', 'section_ids', 'contents', 'metadatas', 'vocab')
+_MMAP_ARRAYS = ('idf_vec', 'post_offsets', 'post_docs', 'post_tf', 'meta_offsets', 'meta_docs')
+
 # ======================================================================
 # Data classes
 # ======================================================================
@@ -33,12 +85,28 @@ class Document:
 class SimpleRAGSystem:
     """
     Lightweight RAG for the provided Kerala Ayurveda corpus.
-    Hybrid retrieval: BM25-like TF scoring + metadata boosts + phrase bonus.
+    Hybrid retrieval: BM25 scoring + metadata boosts + phrase bonus.
+    Chunks are stored column-wise; Document objects are only built for results.
     """
 
     def __init__(self):
-        self.documents: List[Document] = []
         self.corpus_loaded = False
+        self._documents_snapshot = None
+        # Chunk columns, one row per chunk
+        self.doc_ids: List[str] = []
+        self.section_ids: List[str] = []
+        self.contents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.contents_lower: List[str] = []
+        # Inverted index (rebuilt by load_corpus): postings flattened per vocab id into
+        # typed arrays, held as zero-copy NumPy views when NumPy is available
+        self.vocab: Dict[str, int] = {}
+        self.idf_vec = array('d')
+        self.post_offsets = array('q', [0])
+        self.post_docs = array('i')
+        self.post_tf = array('d')
+        self.meta_offsets = array('q', [0])
+        self.meta_docs = array('i')
 
     # -------------------------
     # Corpus loading & chunking
@@ -55,27 +123,92 @@ class SimpleRAGSystem:
                 chunks = self._chunk_csv(doc_id, doc['content'], doc.get('metadata', {}))
             else:
                 chunks = [Document(doc_id, 'main', doc['content'], doc.get('metadata', {}))]
-            self.documents.extend(chunks)
+            for chunk in chunks:
+                self._append_chunk(chunk)
+        self._build_index()
         self.corpus_loaded = True
-        print(f"[INFO] Loaded {len(self.documents)} document chunks")
+        print(f"[INFO] Loaded {len(self.doc_ids)} document chunks")
+
+    @property
+    def documents(self) -> Tuple[Document, ...]:
+        # Read-only snapshot of the chunk columns; add chunks through load_corpus
+        if self._documents_snapshot is None:
+            self._documents_snapshot = tuple(self._document(i) for i in range(len(self.doc_ids)))
+        return self._documents_snapshot
+
+    def _document(self, idx: int) -> Document:
+        return Document(self.doc_ids[idx], self.section_ids[idx], self.contents[idx], self.metadatas[idx])
+
+    def _append_chunk(self, doc: Document):
+        self._documents_snapshot = None
+        self.doc_ids.append(doc.doc_id)
+        self.section_ids.append(doc.section_id)
+        self.contents.append(doc.content)
+        self.metadatas.append(doc.metadata)
+        self.contents_lower.append(doc.content.lower())
+
+    def _build_index(self):
+        # The dict postings only live while the flat arrays are built
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        meta_postings: Dict[str, List[int]] = defaultdict(list)
+        doc_lens = array('i')
+        for idx, (content_lower, metadata) in enumerate(zip(self.contents_lower, self.metadatas)):
+            tokens = self._tokenize(content_lower)
+            tf = Counter(tokens)
+            for term, count in tf.items():
+                postings[term].append((idx, count))
+            metadata_text = ' '.join(str(v) for v in metadata.values()).lower()
+            meta = frozenset(self._tokenize(metadata_text))
+            for term in meta:
+                meta_postings[term].append(idx)
+            doc_lens.append(len(tokens))
+        n = len(self.doc_ids)
+        avgdl = (sum(doc_lens) / n if n else 0.0) or 1.0
+        # BM25 length normalisation: k1 * (1 - b + b * |d| / avgdl)
+        doc_norms = array('d', (
+            _BM25_K1 * (1 - _BM25_B + _BM25_B * dl / avgdl) for dl in doc_lens
+        ))
+        # One column per vocab id: typed int32 doc ids plus the BM25 tf factor
+        # tf * (k1 + 1) / (tf + norm); metadata-only terms get empty content columns
+        terms = list(postings)
+        terms.extend(term for term in meta_postings if term not in postings)
+        self.vocab = {term: col for col, term in enumerate(terms)}
+        self.idf_vec = array('d')
+        self.post_offsets = array('q', [0])
+        self.post_docs = array('i')
+        self.post_tf = array('d')
+        self.meta_offsets = array('q', [0])
+        self.meta_docs = array('i')
+        for term in terms:
+            plist = postings.get(term, ())
+            self.idf_vec.append(math.log((n - len(plist) + 0.5) / (len(plist) + 0.5) + 1) if plist else 0.0)
+            self.post_docs.extend(idx for idx, _ in plist)
+            self.post_tf.extend((tf * (_BM25_K1 + 1)) / (tf + doc_norms[idx]) for idx, tf in plist)
+            self.post_offsets.append(len(self.post_docs))
+            self.meta_docs.extend(meta_postings.get(term, ()))
+            self.meta_offsets.append(len(self.meta_docs))
+        if np is not None:
+            for name in _MMAP_ARRAYS:
+                values = getattr(self, name)
+                setattr(self, name, np.frombuffer(values, dtype=values.typecode))
 
     def _slugify(self, text: str) -> str:
         s = text.lower()
-        s = re.sub(r'[^a-z0-9]+', '_', s)
-        s = re.sub(r'_{2,}', '_', s)
+        if s.isascii():
+            s = s.encode('ascii').translate(_SLUG_TABLE).decode('ascii')
+        else:
+            s = _SLUG_NONALNUM.sub('_', s)
+        s = _SLUG_UNDERSCORES.sub('_', s)
         return s.strip('_')
 
     def _chunk_markdown(self, doc_id: str, content: str, metadata: Dict) -> List[Document]:
         chunks = []
-        sections = re.split(r'\r?\n##\s+', content)
-        if sections:
-            intro = sections[0].strip()
-            if intro:
-                chunks.append(Document(doc_id=doc_id, section_id='intro', content=intro, metadata=metadata))
-        for i, section in enumerate(sections[1:], 1):
-            lines = section.split('\n', 1)
-            section_title = lines[0].strip()
-            section_content = lines[1].strip() if len(lines) > 1 else ''
+        intro_end = len(content)
+        for i, m in enumerate(_MD_SECTION_RE.finditer(content), 1):
+            if i == 1:
+                intro_end = m.start()
+            section_title = m.group('title').strip()
+            section_content = m.group('body').strip()
             full_content = f"## {section_title}\n\n{section_content}"
             chunks.append(Document(
                 doc_id=doc_id,
@@ -83,31 +216,34 @@ class SimpleRAGSystem:
                 content=full_content,
                 metadata={**metadata, 'section_title': section_title}
             ))
+        intro = content[:intro_end].strip()
+        if intro:
+            chunks.insert(0, Document(doc_id=doc_id, section_id='intro', content=intro, metadata=metadata))
         return chunks
 
     def _chunk_faq(self, doc_id: str, content: str, metadata: Dict) -> List[Document]:
         chunks = []
-        # Match '## <num>. Question' followed by answer until next '## <num>.' or EOF
-        pattern = re.compile(r'##\s*\d+\.\s*(.+?)\n\n(.*?)(?=\n##\s*\d+\.|\Z)', re.S)
-        matches = pattern.findall(content)
-        if not matches:
-            # fallback: treat whole faq as single chunk
-            return [Document(doc_id=doc_id, section_id='faq_all', content=content, metadata=metadata)]
-        for i, (question, answer) in enumerate(matches, 1):
-            full_content = f"Q: {question.strip()}\n\nA: {answer.strip()}"
+        for i, m in enumerate(_FAQ_PATTERN.finditer(content), 1):
+            question = m.group(1).strip()
+            full_content = f"Q: {question}\n\nA: {m.group(2).strip()}"
             chunks.append(Document(
                 doc_id=doc_id,
                 section_id=f"faq_{i}_{self._slugify(question)}",
                 content=full_content,
-                metadata={**metadata, 'faq_number': i, 'question': question.strip()}
+                metadata={**metadata, 'faq_number': i, 'question': question}
             ))
+        if not chunks:
+            # fallback: treat whole faq as single chunk
+            return [Document(doc_id=doc_id, section_id='faq_all', content=content, metadata=metadata)]
         return chunks
 
     def _chunk_csv(self, doc_id: str, content: List[Dict], metadata: Dict) -> List[Document]:
         chunks = []
         for row in content:
             formatted = self._format_product_row(row)
-            prod_id = row.get('product_id') or str(hash(row.get('name', '')))
+            # blake2b rather than hash(): str hashes are salted per process (PYTHONHASHSEED)
+            prod_id = row.get('product_id') or hashlib.blake2b(
+                str(row.get('name', '')).encode('utf-8'), digest_size=8).hexdigest()
             chunks.append(Document(
                 doc_id=doc_id,
                 section_id=f"product_{prod_id}",
@@ -129,48 +265,181 @@ class SimpleRAGSystem:
         ]
         return "\n".join(parts)
 
+    # -------------------------
+    # Index persistence
+    # -------------------------
+    def save(self, path: str):
+        state = {name: getattr(self, name) for name in _PICKLED_STATE}
+        arrays = {name: getattr(self, name) for name in _MMAP_ARRAYS}
+        if np is None:
+            # Without NumPy the typed arrays are pickled along with the rest
+            state.update(arrays)
+            arrays = {}
+        state['arrays'] = sorted(arrays)
+        with open(f'{path}.pkl', 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        for name, values in arrays.items():
+            np.save(f'{path}.{name}.npy', values)
+        print(f"[INFO] Saved index for {len(self.doc_ids)} document chunks to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'SimpleRAGSystem':
+        # Only load index files you wrote yourself: the state is unpickled
+        with open(f'{path}.pkl', 'rb') as f:
+            state = pickle.load(f)
+        array_names = state.pop('arrays')
+        rag = cls()
+        for name, value in state.items():
+            setattr(rag, name, value)
+        # Cheaper to recompute than to unpickle a second copy of the text
+        rag.contents_lower = [content.lower() for content in rag.contents]
+        if array_names:
+            if np is None:
+                raise ImportError(f"{path} stores its index arrays as .npy files; loading it needs numpy")
+            # Read-only mappings: worker processes share the pages through the page cache
+            for name in array_names:
+                setattr(rag, name, np.asarray(np.load(f'{path}.{name}.npy', mmap_mode='r')))
+        elif np is not None:
+            for name in _MMAP_ARRAYS:
+                values = getattr(rag, name)
+                setattr(rag, name, np.frombuffer(values, dtype=values.typecode))
+        rag.corpus_loaded = True
+        print(f"[INFO] Loaded index with {len(rag.doc_ids)} document chunks")
+        return rag
+
     # -------------------------
     # Retrieval
     # -------------------------
     def retrieve(self, query: str, top_k: int = 4) -> List[Tuple[Document, float]]:
-        if not self.corpus_loaded:
+        if not self.corpus_loaded or top_k <= 0:
+            return []
+        query_raw = query.lower()
+        # Each distinct term is looked up once; repeats weight its contribution
+        query_counts = Counter(self._tokenize(query_raw))
+        if not query_counts:
             return []
-        query_terms = self._tokenize(query.lower())
-        scored_docs: List[Tuple[Document, float]] = []
-        for doc in self.documents:
-            score = self._score_document(doc, query_terms, query.lower())
-            if score > 0:
-                scored_docs.append((doc, score))
-        scored_docs.sort(key=lambda x: x[1], reverse=True)
-        return scored_docs[:top_k]
-
-    def _tokenize(self, text: str) -> List[str]:
-        return re.findall(r'\b\w+\b', text.lower())
-
-    def _score_document(self, doc: Document, query_terms: List[str], query_raw: str) -> float:
-        doc_text = doc.content.lower()
-        doc_tokens = self._tokenize(doc_text)
-        if not doc_tokens:
-            return 0.0
-        score = 0.0
-        # TF-like scoring
-        for term in query_terms:
-            tf = doc_tokens.count(term)
-            if tf > 0:
-                score += (tf / len(doc_tokens)) * 10.0
-        # Coverage
-        matching_terms = sum(1 for term in query_terms if term in doc_tokens)
-        coverage = matching_terms / len(query_terms) if query_terms else 0.0
-        score += coverage * 5.0
-        # Exact phrase bonus
-        if query_raw in doc_text:
-            score += 15.0
-        # Metadata boost
-        metadata_text = ' '.join(str(v) for v in doc.metadata.values()).lower()
-        for term in query_terms:
-            if term in metadata_text:
-                score += 3.0
-        return score
+        n = len(self.doc_ids)
+        # Selective queries touch few postings and stay on the plain loop
+        vectorize = np is not None and n >= _VECTORIZE_MIN_DOCS
+        if vectorize and self._postings_volume(query_counts) >= _VECTORIZE_POSTINGS_PER_DOC * n:
+            ranked = self._rank_vectorized(*self._score_vectorized(query_counts), top_k)
+        else:
+            scores = self._score_postings(query_counts)
+            ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        phrase_hits = self._phrase_hits(query_raw)
+        # Chunks still to come that may take the phrase bonus (-1: not known up front)
+        pending = -1 if phrase_hits is None else len(phrase_hits)
+        # Min-heap of (score, -idx): the best top_k so far, ties kept in corpus order
+        top: List[Tuple[float, int]] = []
+        for idx, base in ranked:
+            if len(top) == top_k and base + (_PHRASE_BONUS if pending else 0.0) < top[0][0]:
+                # Base scores only fall from here, so nothing left can reach the top_k
+                break
+            if phrase_hits is None:
+                # Exact phrase bonus: a single pattern per query, so a plain substring
+                # search is cheaper than building a multi-pattern automaton
+                hit = query_raw in self.contents_lower[idx]
+            else:
+                hit = idx in phrase_hits
+                pending -= hit
+            item = (base + _PHRASE_BONUS if hit else base, -idx)
+            if len(top) < top_k:
+                heapq.heappush(top, item)
+            elif item > top[0]:
+                heapq.heapreplace(top, item)
+        top.sort(reverse=True)
+        return [(self._document(-neg_idx), score) for score, neg_idx in top]
+
+    def _phrase_hits(self, query_raw: str) -> Optional[Set[int]]:
+        # A query token with non-word characters on both sides inside the query is a
+        # whole token wherever the query occurs, so only chunks on the postings of every
+        # such token can contain it. None if the query has no such token
+        interior = {m.group() for m in _TOKEN_RE.finditer(query_raw)
+                    if m.start() > 0 and m.end() < len(query_raw)}
+        if not interior:
+            return None
+        cols = [self.vocab.get(term) for term in interior]
+        if None in cols:
+            return set()
+        cols.sort(key=lambda col: self.post_offsets[col + 1] - self.post_offsets[col])
+        docs: Set[int] = set()
+        for i, col in enumerate(cols):
+            ids = self.post_docs[self.post_offsets[col]:self.post_offsets[col + 1]].tolist()
+            docs = docs.intersection(ids) if i else set(ids)
+            if not docs:
+                break
+        return {idx for idx in docs if query_raw in self.contents_lower[idx]}
+
+    def _postings_volume(self, query_counts: Counter) -> int:
+        volume = 0
+        for term in query_counts:
+            col = self.vocab.get(term)
+            if col is not None:
+                volume += self.post_offsets[col + 1] - self.post_offsets[col]
+                volume += self.meta_offsets[col + 1] - self.meta_offsets[col]
+        return volume
+
+    def _score_postings(self, query_counts: Counter) -> Dict[int, float]:
+        # Only documents on the postings lists of query terms are visited
+        scores: Dict[int, float] = defaultdict(float)
+        # Terms are distinct, so each posting is one more matched query term (coverage)
+        coverage_weight = _COVERAGE_WEIGHT / len(query_counts)
+        for term, qtf in query_counts.items():
+            col = self.vocab.get(term)
+            if col is None:
+                continue
+            weight = qtf * float(self.idf_vec[col])
+            lo, hi = self.post_offsets[col], self.post_offsets[col + 1]
+            for idx, tf_factor in zip(self.post_docs[lo:hi].tolist(), self.post_tf[lo:hi].tolist()):
+                # BM25 term contribution (saturating in tf)
+                scores[idx] += weight * tf_factor + coverage_weight
+            # Metadata boost
+            lo, hi = self.meta_offsets[col], self.meta_offsets[col + 1]
+            for idx in self.meta_docs[lo:hi].tolist():
+                scores[idx] += _METADATA_BOOST * qtf
+        return scores
+
+    def _score_vectorized(self, query_counts: Counter) -> Tuple[Any, Any]:
+        # Same scores as _score_postings, scattered into one array per query;
+        # returns (indices, scores) arrays of the chunks that scored
+        cols = []
+        qtfs = []
+        for term, qtf in query_counts.items():
+            col = self.vocab.get(term)
+            if col is not None:
+                cols.append(col)
+                qtfs.append(qtf)
+        cols = np.array(cols, dtype=np.int64)
+        qtfs = np.array(qtfs, dtype=float)
+        weights = qtfs * self.idf_vec[cols]
+        meta_boosts = qtfs * _METADATA_BOOST
+        coverage_weight = _COVERAGE_WEIGHT / len(query_counts)
+        scores = np.zeros(len(self.doc_ids))
+        # Doc ids are unique within a column, so fancy-index += adds every posting
+        for col, weight, meta_boost in zip(cols.tolist(), weights.tolist(), meta_boosts.tolist()):
+            lo, hi = self.post_offsets[col], self.post_offsets[col + 1]
+            scores[self.post_docs[lo:hi]] += weight * self.post_tf[lo:hi] + coverage_weight
+            lo, hi = self.meta_offsets[col], self.meta_offsets[col + 1]
+            scores[self.meta_docs[lo:hi]] += meta_boost
+        indices = np.flatnonzero(scores)
+        return indices, scores[indices]
+
+    def _rank_vectorized(self, indices, values, top_k: int) -> Iterator[Tuple[int, float]]:
+        # Descending base order for retrieve's scan, converted to Python lazily: the head
+        # is picked with argpartition, the rest is only sorted if the scan reaches it
+        head = max(top_k * 8, 64)
+        if head < len(values):
+            part = np.argpartition(-values, head)
+            blocks = (part[:head], part[head:])
+        else:
+            blocks = (np.arange(len(values)),)
+        for block in blocks:
+            block = block[np.argsort(-values[block], kind='stable')]
+            yield from zip(indices[block].tolist(), values[block].tolist())
+
+    def _tokenize(self, text_lower: str) -> List[str]:
+        # Callers pass text that is already lowercased (cached or once per query)
+        return _TOKEN_RE.findall(text_lower)
 
     # -------------------------
     # Answering
@@ -183,18 +452,13 @@ class SimpleRAGSystem:
                 'citations': [],
                 'confidence': 'low'
             }
-        context_parts = []
-        citations: List[Citation] = []
-        for i, (doc, score) in enumerate(retrieved, 1):
-            header = f"[Source {i}] {doc.doc_id} | {doc.section_id}"
-            # Truncate content for context safety in a demo
-            snippet = doc.content if len(doc.content) <= 1500 else doc.content[:1500] + "..."
-            context_parts.append(f"{header}\n{snippet}\n")
-            citations.append(Citation(doc_id=doc.doc_id, section_id=doc.section_id, snippet=snippet[:120]))
-        context = "\n".join(context_parts)
+        citations = [
+            Citation(doc_id=doc.doc_id, section_id=doc.section_id, snippet=doc.content[:120])
+            for doc, _ in retrieved
+        ]
 
         # Simulated generation (replace with LLM call in production).
-        answer_text = self._generate_answer(query, context, retrieved)
+        answer_text = self._generate_answer(query, retrieved)
 
         return {
             'answer': answer_text,
@@ -202,16 +466,16 @@ class SimpleRAGSystem:
             'confidence': 'high' if len(retrieved) >= 2 else 'medium'
         }
 
-    def _generate_answer(self, query: str, context: str, retrieved: List[Tuple[Document, float]]) -> str:
-        # Production: call LLM with a prompt like:
+    def _generate_answer(self, query: str, retrieved: List[Tuple[Document, float]]) -> str:
+        # Production: build "[Source N] <doc_id> | <section_id>" context from `retrieved`
+        # and call LLM with a prompt like:
         # "Only use the following sources. Answer concisely and attach inline numeric citations (1),(2)..."
         # Demo: extract first meaningful sentences from top 2 retrieved
         parts = []
         for doc, _ in retrieved[:2]:
-            sentences = re.split(r'(?<=[.!?])\s+', doc.content.strip())
-            meaningful = [s.strip() for s in sentences if len(s.strip()) > 40]
-            if meaningful:
-                parts.append(meaningful[0])
+            sentence = self._first_meaningful_sentence(doc.content)
+            if sentence:
+                parts.append(sentence)
         if parts:
             # Append mapping hint to allow caller to map (1),(2) -> doc ids
             return " ".join(parts)
@@ -219,6 +483,17 @@ class SimpleRAGSystem:
         topdoc = retrieved[0][0].content
         return topdoc[:400] + ("..." if len(topdoc) > 400 else "")
 
+    def _first_meaningful_sentence(self, text: str, min_len: int = 40) -> str:
+        # Walk sentence boundaries lazily and stop at the first long-enough sentence
+        start = 0
+        for m in _SENT_SPLIT.finditer(text):
+            sentence = text[start:m.start()].strip()
+            if len(sentence) > min_len:
+                return sentence
+            start = m.end()
+        sentence = text[start:].strip()
+        return sentence if len(sentence) > min_len else ''
+
 # ======================================================================
 # Example corpus & test runner
 # ======================================================================
@@ -341,12 +616,93 @@ def run_example_queries():
             print(f"  [{j}] {c['doc_id']} | {c['section_id']} -> {c['snippet'][:100]}...")
         print("\nCONFIDENCE:", result['confidence'])
         print("\nPOTENTIAL FAILURE MODES:")
-        if 'contraindication' in query.lower():
+        query_lower = query.lower()
+        if 'contraindication' in query_lower:
             print("  - May miss contraindications found in other docs; merging notes incorrectly.")
-        elif 'benefit' in query.lower():
+        elif 'benefit' in query_lower:
             print("  - Risk of paraphrasing to imply stronger efficacy than corpus language.")
         else:
             print("  - Might produce generalised advice lacking user-specific nuance.")
 
+def create_large_corpus(n_docs: int = 1200, seed: int = 0) -> List[Dict[str, Any]]:
+    # Synthetic chunks over the sample corpus vocabulary (Zipf-like word frequencies),
+    # large enough for the NumPy scoring path
+    rng = random.Random(seed)
+    words = sorted({
+        word for doc in create_sample_corpus() if isinstance(doc['content'], str)
+        for word in _TOKEN_RE.findall(doc['content'].lower())
+    })
+    rng.shuffle(words)
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    return [
+        {
+            'id': f'synthetic_{i}',
+            'type': 'text',
+            'content': ' '.join(rng.choices(words, weights, k=rng.randint(20, 80))),
+            'metadata': {'category': rng.choice(words[:50])},
+        }
+        for i in range(n_docs)
+    ]
+
+def _reference_retrieve(rag: SimpleRAGSystem, query: str, top_k: int) -> List[Tuple[Document, float]]:
+    # Phrase-checks every candidate and ranks them all: what retrieve must return
+    query_raw = query.lower()
+    scores = rag._score_postings(Counter(rag._tokenize(query_raw)))
+    scored = [
+        (idx, score + _PHRASE_BONUS if query_raw in rag.contents_lower[idx] else score)
+        for idx, score in scores.items()
+    ]
+    scored.sort(key=lambda x: (-x[1], x[0]))
+    return [(rag._document(idx), score) for idx, score in scored[:top_k]]
+
+def run_index_check():
+    rag = SimpleRAGSystem()
+    rag.load_corpus(create_sample_corpus() + create_large_corpus())
+    rng = random.Random(1)
+    words = sorted(rag.vocab)
+    queries = [
+        "What are the key benefits of Ashwagandha Stress Balance Tablets?",
+        "Are there any contraindications for Triphala Capsules?",
+        "Can Ayurveda help with stress and sleep?",
+    ]
+    queries += [' '.join(rng.sample(words, rng.randint(1, 4))) for _ in range(100)]
+    for _ in range(100):
+        # Substrings of chunks, so the phrase bonus is exercised
+        text = rag.contents_lower[rng.randrange(len(rag.contents_lower))]
+        start = rng.randrange(len(text))
+        queries.append(text[start:start + rng.randint(3, 40)])
+
+    failures = []
+    n_vectorized = 0
+    for query in queries:
+        query_counts = Counter(rag._tokenize(query.lower()))
+        if not query_counts:
+            continue
+        if np is not None:
+            indices, values = rag._score_vectorized(query_counts)
+            if dict(zip(indices.tolist(), values.tolist())) != rag._score_postings(query_counts):
+                failures.append(f"NumPy and postings scores differ for {query!r}")
+            n_vectorized += rag._postings_volume(query_counts) >= _VECTORIZE_POSTINGS_PER_DOC * len(rag.doc_ids)
+        for top_k in (1, 4, 10):
+            if rag.retrieve(query, top_k) != _reference_retrieve(rag, query, top_k):
+                failures.append(f"retrieve({query!r}, top_k={top_k}) differs from the full ranking")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index')
+        rag.save(path)
+        loaded = SimpleRAGSystem.load(path)
+        for query in queries:
+            if loaded.retrieve(query) != rag.retrieve(query):
+                failures.append(f"retrieve({query!r}) differs after save/load")
+
+    print(f"[CHECK] {len(queries)} queries over {len(rag.doc_ids)} chunks, "
+          f"{n_vectorized} scored on NumPy arrays")
+    if failures:
+        raise AssertionError("\n".join(failures[:10]))
+    print("[CHECK] Scoring paths and save/load agree")
+
 if __name__ == "__main__":
-    run_example_queries()
+    if '--check' in sys.argv[1:]:
+        run_index_check()
+    else:
+        run_example_queries()